@@ -4,14 +4,108 @@ Coverage Analysis Script - Excludes Generated Files
 Calculates real application coverage by architectural layers
 """
 
+import argparse
 import re
 import os
 from collections import defaultdict
 from typing import Dict, List, Tuple
 
+PACKAGE_NAME = 'edulift'
+
+class LcovRecord:
+    """Detail lines of one source file, merged across repeated SF: records"""
+
+    def __init__(self):
+        self.other_lines = {}
+        self.functions = {}
+        self.branches = {}
+        self.lines = {}
+
+    def add_line(self, line: str) -> None:
+        if line.startswith('DA:'):
+            line_number, hits = line[3:].split(',')[:2]
+            self.lines[line_number] = self.lines.get(line_number, 0) + int(hits)
+
+        elif line.startswith('FNDA:'):
+            count, name = line[5:].split(',', 1)
+            self.functions[name] = self.functions.get(name, 0) + int(count)
+
+        elif line.startswith('BRDA:'):
+            block_line, block, branch, taken = line[5:].split(',')
+            self.add_branch((block_line, block, branch), taken if taken == '-' else int(taken))
+
+        elif line.startswith(('LF:', 'LH:', 'FNF:', 'FNH:', 'BRF:', 'BRH:')):
+            # Summaries are recomputed from the detail lines
+            pass
+
+        elif line:
+            # TN:, FN: and other per-record lines are kept once, as-is
+            self.other_lines[line] = None
+
+    def add_branch(self, key: Tuple[str, str, str], taken) -> None:
+        """Sum branch counts; '-' (never executed) only survives if all are '-'"""
+        previous = self.branches.get(key, '-')
+        if taken == '-':
+            self.branches[key] = previous
+        else:
+            self.branches[key] = taken + (0 if previous == '-' else previous)
+
+    def merge(self, other: 'LcovRecord') -> None:
+        """Add the counts of another record for the same source file"""
+        for line in other.other_lines:
+            self.other_lines[line] = None
+        for name, count in other.functions.items():
+            self.functions[name] = self.functions.get(name, 0) + count
+        for key, taken in other.branches.items():
+            self.add_branch(key, taken)
+        for line_number, hits in other.lines.items():
+            self.lines[line_number] = self.lines.get(line_number, 0) + hits
+
+    def write(self, output, file_path: str) -> None:
+        output.write(f"SF:{file_path}\n")
+        for line in self.other_lines:
+            output.write(line + "\n")
+
+        for name, count in self.functions.items():
+            output.write(f"FNDA:{count},{name}\n")
+        if self.functions:
+            output.write(f"FNF:{len(self.functions)}\n")
+            output.write(f"FNH:{sum(1 for c in self.functions.values() if c > 0)}\n")
+
+        for (block_line, block, branch), taken in self.branches.items():
+            output.write(f"BRDA:{block_line},{block},{branch},{taken}\n")
+        if self.branches:
+            output.write(f"BRF:{len(self.branches)}\n")
+            output.write(f"BRH:{sum(1 for t in self.branches.values() if t != '-' and t > 0)}\n")
+
+        for line_number, hits in self.lines.items():
+            output.write(f"DA:{line_number},{hits}\n")
+        output.write(f"LF:{len(self.lines)}\n")
+        output.write(f"LH:{sum(1 for h in self.lines.values() if h > 0)}\n")
+        output.write("end_of_record\n")
+
+def read_lcov_records(lcov_path: str) -> Dict[str, LcovRecord]:
+    """Read an LCOV file into records keyed by SF: path, in input order"""
+    records = {}
+    record = None
+
+    with open(lcov_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+
+            if line.startswith('SF:'):
+                record = records.setdefault(line[3:], LcovRecord())
+            elif line == 'end_of_record':
+                record = None
+            elif record is not None:
+                record.add_line(line)
+
+    return records
+
 class CoverageAnalyzer:
-    def __init__(self, lcov_file: str):
+    def __init__(self, lcov_file: str, project_root: str = None):
         self.lcov_file = lcov_file
+        self.project_root = os.path.abspath(project_root or os.getcwd())
         self.coverage_data = defaultdict(dict)
         self.excluded_patterns = [
             r'\.g\.dart$',      # Generated files
@@ -26,6 +120,72 @@ class CoverageAnalyzer:
                 return True
         return False
 
+    def normalize_path(self, file_path: str) -> str:
+        """Convert package: and project-absolute source paths to lib/... paths"""
+        path = file_path.replace('\\', '/')
+
+        package_prefix = f'package:{PACKAGE_NAME}/'
+        if path.startswith(package_prefix):
+            return 'lib/' + path[len(package_prefix):]
+
+        if path.startswith('./'):
+            return path[2:]
+
+        # Only paths inside the project are rewritten; third-party sources
+        # (pub cache, SDK) stay as they are so they never look like app code
+        root = self.project_root.replace('\\', '/').rstrip('/') + '/'
+        if path.startswith(root):
+            return path[len(root):]
+
+        return path
+
+    def write_filtered_lcov(self, output_path: str) -> Dict[str, int]:
+        """Write a filtered, path-normalized LCOV with repeated SF: records summed
+        Holds one record plus O(distinct repeated paths); output is deterministic"""
+        stats = {'records_written': 0, 'records_excluded': 0, 'records_merged': 0}
+
+        remaining = defaultdict(int)
+        with open(self.lcov_file, 'r') as source:
+            for line in source:
+                if line.startswith('SF:'):
+                    remaining[self.normalize_path(line[3:].strip())] += 1
+
+        merged = {}
+        current_file = None
+        record = None
+
+        with open(self.lcov_file, 'r') as source, \
+                open(output_path, 'w', newline='\n') as output:
+            for line in source:
+                line = line.strip()
+
+                if line.startswith('SF:'):
+                    current_file = self.normalize_path(line[3:])
+                    record = merged.pop(current_file, None) or LcovRecord()
+
+                elif current_file is None:
+                    continue
+
+                elif line == 'end_of_record':
+                    remaining[current_file] -= 1
+                    if self.is_excluded(current_file):
+                        if remaining[current_file] == 0:
+                            stats['records_excluded'] += 1
+                    elif remaining[current_file] > 0:
+                        merged[current_file] = record
+                        stats['records_merged'] += 1
+                    else:
+                        record.write(output, current_file)
+                        stats['records_written'] += 1
+
+                    current_file = None
+                    record = None
+
+                elif not self.is_excluded(current_file):
+                    record.add_line(line)
+
+        return stats
+
     def parse_lcov(self) -> None:
         """Parse LCOV file and extract coverage data"""
         if not os.path.exists(self.lcov_file):
@@ -223,7 +383,27 @@ class CoverageAnalyzer:
         return "\n".join(report)
 
 def main():
-    analyzer = CoverageAnalyzer("coverage/lcov.info")
+    parser = argparse.ArgumentParser(description="Analyze coverage excluding generated files")
+    parser.add_argument('lcov_file', nargs='?', default="coverage/lcov.info")
+    parser.add_argument('--write-filtered', metavar='OUTPUT',
+                        help="Write a filtered, path-normalized LCOV file instead of the report")
+    parser.add_argument('--project-root', default=None,
+                        help="Absolute source paths under this directory become relative (default: cwd)")
+    args = parser.parse_args()
+
+    analyzer = CoverageAnalyzer(args.lcov_file, args.project_root)
+
+    if args.write_filtered:
+        if not os.path.exists(args.lcov_file):
+            print(f"❌ LCOV file not found: {args.lcov_file}")
+            return
+        stats = analyzer.write_filtered_lcov(args.write_filtered)
+        print(f"💾 Filtered LCOV saved to: {args.write_filtered}")
+        print(f"   Records written: {stats['records_written']}")
+        print(f"   Generated files excluded: {stats['records_excluded']}")
+        print(f"   Repeated records merged: {stats['records_merged']}")
+        return
+
     report = analyzer.generate_report()
     print(report)
 
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Failure x Coverage Analysis
+Maps failing tests to the lib/ sources they exercise and joins them against
+LCOV coverage to find layers and features that are both failing and
+under-covered
+"""
+
+import argparse
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from analyze_coverage import CoverageAnalyzer, LcovRecord, read_lcov_records
+from analyze_coverage_by_layer import CoverageMetrics, FileCoverage, classify_layer
+from analyze_test_failures import read_test_events
+
+# package:, file://, absolute and lib/-relative .dart paths in stack frames
+STACK_FRAME_PATTERN = re.compile(
+    r'(?:package:\w+/|file://|/|[A-Za-z]:[\\/]|(?<![\w/.-])lib/)[^\s()]*?\.dart'
+)
+
+
+@dataclass
+class JoinedGroup:
+    failing_tests: int = 0
+    failing_sources: Set[str] = field(default_factory=set)
+    metrics: CoverageMetrics = field(default_factory=CoverageMetrics)
+
+
+def parse_stack_sources(stack_trace: str, analyzer: CoverageAnalyzer) -> Tuple[str, ...]:
+    """Extract app lib/... paths from a Dart stack trace, skipping third-party frames"""
+    sources = []
+    for match in STACK_FRAME_PATTERN.finditer(stack_trace):
+        frame_path = match.group(0)
+        if frame_path.startswith('file://'):
+            frame_path = frame_path[len('file://'):]
+        path = analyzer.normalize_path(frame_path)
+        if path.startswith('lib/') and path not in sources:
+            sources.append(path)
+    return tuple(sources)
+
+
+def normalize_test_path(file_path: str) -> str:
+    """Convert an absolute test file path to test/..."""
+    path = file_path.replace('\\', '/')
+    if path.startswith('test/'):
+        return path
+    marker = path.rfind('/test/')
+    return path[marker + 1:] if marker != -1 else path
+
+
+def common_suffix_length(a: List[str], b: List[str]) -> int:
+    length = 0
+    for left, right in zip(reversed(a), reversed(b)):
+        if left != right:
+            break
+        length += 1
+    return length
+
+
+class CoverageIndex:
+    """Hash index of non-generated coverage records keyed by lib/... path"""
+
+    def __init__(self, records: Dict[str, LcovRecord], analyzer: CoverageAnalyzer):
+        self.analyzer = analyzer
+        self.by_path = {}
+        self.by_basename = defaultdict(list)
+
+        # Raw SF: paths that normalize to the same file are summed per line,
+        # like CoverageAnalyzer.write_filtered_lcov does
+        merged = {}
+        for raw_path, record in records.items():
+            path = analyzer.normalize_path(raw_path)
+            if not analyzer.is_excluded(path):
+                merged.setdefault(path, LcovRecord()).merge(record)
+
+        for path, record in merged.items():
+            branches_taken = [t for t in record.branches.values() if t != '-']
+            metrics = CoverageMetrics(
+                lines_found=len(record.lines),
+                lines_hit=sum(1 for hits in record.lines.values() if hits > 0),
+                functions_found=len(record.functions),
+                functions_hit=sum(1 for count in record.functions.values() if count > 0),
+                branches_found=len(record.branches),
+                branches_hit=sum(1 for taken in branches_taken if taken > 0),
+            )
+            self.by_path[path] = FileCoverage(path=path, metrics=metrics, layer=classify_layer(path))
+            self.by_basename[path.rsplit('/', 1)[-1]].append(path)
+
+    def source_for_test(self, test_path: str) -> Optional[str]:
+        """Find the lib/ file a *_test.dart file is named after"""
+        basename = test_path.rsplit('/', 1)[-1]
+        if not basename.endswith('_test.dart'):
+            return None
+
+        candidates = self.by_basename.get(basename[:-len('_test.dart')] + '.dart')
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        # test/unit/features/x/foo_test.dart -> lib/features/x/foo.dart
+        test_dirs = test_path.split('/')[1:-1]
+        return max(candidates,
+                   key=lambda path: common_suffix_length(path.split('/')[1:-1], test_dirs))
+
+    def sources_for_failure(self, failure: Dict, stack_cache: Dict[str, Tuple[str, ...]]) -> List[str]:
+        """Map a failure to the covered lib/ files it exercises"""
+        sources = []
+
+        convention_source = self.source_for_test(normalize_test_path(failure['file']))
+        if convention_source:
+            sources.append(convention_source)
+
+        stack_trace = failure['stack_trace']
+        if stack_trace not in stack_cache:
+            stack_cache[stack_trace] = parse_stack_sources(stack_trace, self.analyzer)
+
+        for path in stack_cache[stack_trace]:
+            if path in self.by_path and path not in sources:
+                sources.append(path)
+
+        return sources
+
+
+def join_failures_with_coverage(failures: List[Dict], index: CoverageIndex,
+                                analyzer: CoverageAnalyzer):
+    """Group failing sources and their coverage by layer and by feature"""
+    layers = defaultdict(JoinedGroup)
+    features = defaultdict(JoinedGroup)
+    failing_sources = defaultdict(int)
+    unmapped = 0
+    # Failures sharing a stack trace (e.g. one broken helper) parse it once
+    stack_cache = {}
+
+    for failure in failures:
+        sources = index.sources_for_failure(failure, stack_cache)
+        if not sources:
+            unmapped += 1
+            continue
+
+        touched_groups = set()
+        for path in sources:
+            failing_sources[path] += 1
+            file_coverage = index.by_path[path]
+            for group in (layers[file_coverage.layer], features[analyzer.extract_feature(path)]):
+                if id(group) not in touched_groups:
+                    group.failing_tests += 1
+                    touched_groups.add(id(group))
+                if path not in group.failing_sources:
+                    group.failing_sources.add(path)
+                    group.metrics.lines_found += file_coverage.metrics.lines_found
+                    group.metrics.lines_hit += file_coverage.metrics.lines_hit
+
+    return layers, features, failing_sources, unmapped
+
+
+def write_group_table(f, title: str, groups: Dict[str, JoinedGroup], threshold: float):
+    f.write(f"## {title}\n\n")
+    f.write("| Name | Failures + Errors | Failing Sources | Line Coverage | Status |\n")
+    f.write("|------|-------------------|-----------------|---------------|--------|\n")
+
+    ordered = sorted(groups.items(), key=lambda item: (item[1].metrics.line_coverage, item[0]))
+    for name, group in ordered:
+        coverage = group.metrics.line_coverage
+        status = "🔴 FAILING + LOW COVERAGE" if coverage < threshold else "🟡 FAILING"
+        f.write(f"| {name} | {group.failing_tests} | {len(group.failing_sources)} | "
+                f"{coverage:.1f}% ({group.metrics.lines_hit}/{group.metrics.lines_found}) | {status} |\n")
+    f.write("\n")
+
+
+def generate_report(failures: List[Dict], errors: List[Dict], index: CoverageIndex,
+                    analyzer: CoverageAnalyzer, output_path: str, threshold: float = 80.0):
+    """Generate the joined failure and coverage report"""
+    failing = failures + errors
+    layers, features, failing_sources, unmapped = join_failures_with_coverage(failing, index, analyzer)
+
+    with open(output_path, 'w') as f:
+        f.write("# Failing Tests x Coverage Analysis\n\n")
+        f.write(f"**Assertion Failures**: {len(failures)}\n")
+        f.write(f"**Runtime Errors**: {len(errors)}\n")
+        f.write(f"**Mapped to lib/ Sources**: {len(failing) - unmapped} of {len(failing)}\n")
+        f.write(f"**Failing Sources**: {len(failing_sources)}\n")
+        f.write(f"**Coverage Threshold**: {threshold:.0f}%\n\n")
+
+        write_group_table(f, "🏗️ By Architectural Layer", layers, threshold)
+        write_group_table(f, "🧩 By Feature", features, threshold)
+
+        hotspots = [
+            (path, count, index.by_path[path])
+            for path, count in failing_sources.items()
+            if index.by_path[path].metrics.line_coverage < threshold
+        ]
+        hotspots.sort(key=lambda item: (item[2].metrics.line_coverage, -item[1], item[0]))
+
+        f.write("## 🚨 Failing and Under-Covered Sources\n\n")
+        if hotspots:
+            f.write("| File | Layer | Failures + Errors | Line Coverage |\n")
+            f.write("|------|-------|-------------------|---------------|\n")
+            for path, count, file_coverage in hotspots:
+                f.write(f"| `{path}` | {file_coverage.layer} | {count} | "
+                        f"{file_coverage.metrics.line_coverage:.1f}% |\n")
+        else:
+            f.write(f"✅ No failing source is below {threshold:.0f}% coverage\n")
+
+        f.write("\n---\n")
+        f.write("*Failures mapped by test file name and stack trace frames*\n")
+
+    return layers, features, failing_sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join failing tests with coverage by layer and feature")
+    parser.add_argument('test_results', help="`flutter test --machine` output")
+    parser.add_argument('lcov_file', nargs='?', default="coverage/lcov.info")
+    parser.add_argument('-o', '--output', default="failure_coverage_report.md")
+    parser.add_argument('--threshold', type=float, default=80.0,
+                        help="Line coverage below which failing code is flagged (default: 80)")
+    parser.add_argument('--project-root', default=None,
+                        help="Absolute source paths under this directory become relative (default: cwd)")
+    args = parser.parse_args()
+
+    analyzer = CoverageAnalyzer(args.lcov_file, args.project_root)
+    index = CoverageIndex(read_lcov_records(args.lcov_file), analyzer)
+    failures, errors = read_test_events(args.test_results)
+
+    layers, features, failing_sources = generate_report(
+        failures, errors, index, analyzer, args.output, args.threshold)
+
+    print(f"Assertion failures: {len(failures)}, runtime errors: {len(errors)}, "
+          f"failing sources: {len(failing_sources)}")
+    for name, group in sorted(layers.items()):
+        if group.metrics.line_coverage < args.threshold:
+            print(f"⚠️  {name} layer: {group.failing_tests} failures + errors, "
+                  f"{group.metrics.line_coverage:.1f}% coverage")
+    print(f"Report generated: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,51 +5,73 @@ import sys
 from collections import defaultdict, Counter
 import re
 
-def analyze_test_failures(json_file_path):
+def record_test_event(data, test_info, failures, errors):
     """
-    Systematically analyze test failures from JSON output
+    Update test metadata and failure lists from a single --machine event
+    """
+    # Collect test metadata
+    if data.get('type') == 'testStart':
+        test_info[data['test']['id']] = {
+            'name': data['test']['name'],
+            'file': data['test'].get('url', '').replace('file://', '') if data['test'].get('url') else '',
+            'line': data['test'].get('line')
+        }
+        return None
+
+    # Collect failures and errors
+    if data.get('type') == 'error':
+        test_id = data.get('testID')
+        if test_id in test_info:
+            failure_data = {
+                'testID': test_id,
+                'test_name': test_info[test_id]['name'],
+                'file': test_info[test_id]['file'],
+                'line': test_info[test_id]['line'],
+                'error_message': data.get('error', ''),
+                'stack_trace': data.get('stackTrace', ''),
+                'is_failure': data.get('isFailure', False)
+            }
+
+            if failure_data['is_failure']:
+                failures.append(failure_data)
+            else:
+                errors.append(failure_data)
+            return failure_data
+
+    return None
+
+def read_test_events(json_file_path):
+    """
+    Collect failures and runtime errors from `flutter test --machine` output
     """
     failures = []
     errors = []
     test_info = {}
     
-    print("=== UNIT TEST FAILURE ANALYSIS ===")
-    print()
-    
     with open(json_file_path, 'r') as f:
         for line in f:
             try:
                 data = json.loads(line.strip())
-                
-                # Collect test metadata
-                if data.get('type') == 'testStart':
-                    test_info[data['test']['id']] = {
-                        'name': data['test']['name'],
-                        'file': data['test'].get('url', '').replace('file://', '') if data['test'].get('url') else '',
-                        'line': data['test'].get('line')
-                    }
-                
-                # Collect failures and errors
-                elif data.get('type') == 'error':
-                    test_id = data.get('testID')
-                    if test_id in test_info:
-                        failure_data = {
-                            'testID': test_id,
-                            'test_name': test_info[test_id]['name'],
-                            'file': test_info[test_id]['file'],
-                            'line': test_info[test_id]['line'],
-                            'error_message': data.get('error', ''),
-                            'stack_trace': data.get('stackTrace', ''),
-                            'is_failure': data.get('isFailure', False)
-                        }
-                        
-                        if failure_data['is_failure']:
-                            failures.append(failure_data)
-                        else:
-                            errors.append(failure_data)
-                            
             except json.JSONDecodeError:
                 continue
+            if isinstance(data, dict):
+                record_test_event(data, test_info, failures, errors)
+
+    return failures, errors
+
+def analyze_test_failures(json_file_path):
+    """
+    Systematically analyze test failures from JSON output
+    """
+    failures, errors = read_test_events(json_file_path)
+    return report_test_failures(failures, errors)
+
+def report_test_failures(failures, errors):
+    """
+    Categorize collected failures and print the analysis report
+    """
+    print("=== UNIT TEST FAILURE ANALYSIS ===")
+    print()
     
     # Categorize failures
     failure_categories = defaultdict(list)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Sharded Flutter Test Runner
+Runs `flutter test` shards concurrently and feeds their --machine events and
+coverage into the failure and coverage analyzers as each shard reports
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+from typing import AsyncIterator, List, Optional
+
+from analyze_coverage import CoverageAnalyzer, LcovRecord, read_lcov_records
+from analyze_test_failures import record_test_event, report_test_failures
+
+REPLAY_COMMAND = '_replay'
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def read_lines(stream: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    """Yield newline-terminated lines of any length from a subprocess stream"""
+    pending = b''
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        if b'\n' not in chunk:
+            continue
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+class ShardRunner:
+    """Launches test shards and collects their results as they stream in"""
+
+    def __init__(self, shard_count: int, cpu_budget: int, coverage_dir: str,
+                 test_paths: List[str], replay_dir: Optional[str] = None):
+        self.shard_count = shard_count
+        self.cpu_budget = max(1, cpu_budget)
+        self.coverage_dir = coverage_dir
+        self.test_paths = test_paths
+        self.replay_dir = replay_dir
+        self.failures = []
+        self.errors = []
+        self.shard_coverage = {}
+        self.shard_results = {}
+        # Never run more shards at once than there are CPUs in the budget
+        self.slots = asyncio.Semaphore(min(self.shard_count, self.cpu_budget))
+
+    @property
+    def shard_concurrency(self) -> int:
+        """Test files each shard may run in parallel within the CPU budget"""
+        return max(1, self.cpu_budget // min(self.shard_count, self.cpu_budget))
+
+    def shard_coverage_path(self, shard_index: int) -> str:
+        return os.path.join(self.coverage_dir, f"shard_{shard_index}.lcov")
+
+    def shard_command(self, shard_index: int) -> List[str]:
+        """Build the command line for a single shard"""
+        coverage_path = self.shard_coverage_path(shard_index)
+
+        if self.replay_dir:
+            return [
+                sys.executable, os.path.abspath(__file__), REPLAY_COMMAND,
+                os.path.join(self.replay_dir, f"shard_{shard_index}.jsonl"),
+                os.path.join(self.replay_dir, f"shard_{shard_index}.lcov"),
+                coverage_path,
+            ]
+
+        return [
+            'flutter', 'test',
+            '--machine',
+            '--coverage',
+            f'--coverage-path={coverage_path}',
+            f'--total-shards={self.shard_count}',
+            f'--shard-index={shard_index}',
+            f'--concurrency={self.shard_concurrency}',
+        ] + self.test_paths
+
+    async def run_shard(self, shard_index: int) -> int:
+        """Run one shard, recording failures as its events arrive"""
+        # Test IDs are only unique within a single `flutter test` run
+        test_info = {}
+
+        coverage_path = self.shard_coverage_path(shard_index)
+        # Never merge coverage left behind by a previous run
+        if os.path.exists(coverage_path):
+            os.remove(coverage_path)
+
+        async with self.slots:
+            process = await asyncio.create_subprocess_exec(
+                *self.shard_command(shard_index),
+                stdout=asyncio.subprocess.PIPE,
+            )
+
+            try:
+                async for raw_line in read_lines(process.stdout):
+                    try:
+                        data = json.loads(raw_line.decode('utf-8', 'replace').strip())
+                    except json.JSONDecodeError:
+                        continue
+                    if not isinstance(data, dict):
+                        continue
+
+                    failure = record_test_event(data, test_info, self.failures, self.errors)
+                    if failure:
+                        kind = 'FAIL' if failure['is_failure'] else 'ERROR'
+                        print(f"   [shard {shard_index}] {kind}: {failure['test_name']}", flush=True)
+
+                return_code = await process.wait()
+            except Exception as error:
+                print(f"❌ Shard {shard_index} failed: {error}", flush=True)
+                return_code = 1
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+
+        if os.path.exists(coverage_path):
+            try:
+                # Each shard is parsed into its own records; nothing shared is
+                # mutated from the worker thread
+                self.shard_coverage[shard_index] = await asyncio.to_thread(
+                    read_lcov_records, coverage_path)
+            except (OSError, ValueError) as error:
+                print(f"❌ Shard {shard_index} coverage could not be merged: {error}", flush=True)
+                return_code = return_code or 1
+        else:
+            print(f"⚠️  Shard {shard_index} produced no coverage: {coverage_path}")
+
+        self.shard_results[shard_index] = {
+            'return_code': return_code,
+            'tests': len(test_info),
+        }
+        print(f"✅ Shard {shard_index} finished (exit {return_code}, {len(test_info)} tests)", flush=True)
+        return return_code
+
+    def write_combined_lcov(self, output_path: str) -> None:
+        """Merge shard coverage in shard order so the output does not depend on timing"""
+        combined = {}
+        for shard_index in sorted(self.shard_coverage):
+            for source_file, record in self.shard_coverage[shard_index].items():
+                combined.setdefault(source_file, LcovRecord()).merge(record)
+
+        with open(output_path, 'w', newline='\n') as f:
+            for source_file, record in combined.items():
+                record.write(f, source_file)
+
+    async def run(self) -> int:
+        """Run all shards and print the combined report once the last one ends"""
+        os.makedirs(self.coverage_dir, exist_ok=True)
+
+        print(f"🚀 Running {self.shard_count} shards "
+              f"(CPU budget {self.cpu_budget}, concurrency {self.shard_concurrency} per shard)")
+        print()
+
+        return_codes = await asyncio.gather(
+            *(self.run_shard(index) for index in range(self.shard_count))
+        )
+
+        print()
+        report_test_failures(self.failures, self.errors)
+
+        combined_lcov = os.path.join(self.coverage_dir, 'lcov.info')
+        self.write_combined_lcov(combined_lcov)
+        print(CoverageAnalyzer(combined_lcov).generate_report())
+
+        # Shards killed by a signal report negative exit codes
+        return next((code for code in return_codes if code != 0), 0)
+
+
+def replay_shard(events_path: str, lcov_path: str, coverage_path: str) -> int:
+    """Fake `flutter test` that replays a recorded --machine event log"""
+    failed = False
+
+    with open(events_path, 'r') as f:
+        for line in f:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+            # Exit like `flutter test` does when the recorded run failed
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict) and (
+                    data.get('type') == 'error'
+                    or (data.get('type') == 'done' and data.get('success') is False)):
+                failed = True
+
+    if os.path.exists(lcov_path):
+        shutil.copyfile(lcov_path, coverage_path)
+
+    return 1 if failed else 0
+
+
+def main(argv: List[str]) -> int:
+    if argv and argv[0] == REPLAY_COMMAND:
+        return replay_shard(*argv[1:4])
+
+    parser = argparse.ArgumentParser(description="Run flutter test shards concurrently")
+    parser.add_argument('test_paths', nargs='*', help="Test files or directories (default: all)")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="Number of shards (default: CPU budget, or recorded logs in replay mode)")
+    parser.add_argument('--cpu-budget', type=int, default=os.cpu_count() or 1,
+                        help="Total CPUs shared by all shards (default: all CPUs)")
+    parser.add_argument('--coverage-dir', default='coverage',
+                        help="Directory for per-shard and combined LCOV files")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Replay recorded shard_<n>.jsonl/shard_<n>.lcov files instead of running flutter")
+    args = parser.parse_args(argv)
+
+    shard_count = args.shards
+    if shard_count is None:
+        if args.replay:
+            shard_count = len([name for name in os.listdir(args.replay)
+                               if name.startswith('shard_') and name.endswith('.jsonl')])
+        else:
+            shard_count = args.cpu_budget
+
+    if shard_count < 1:
+        print("❌ No shards to run")
+        return 1
+
+    runner = ShardRunner(shard_count, args.cpu_budget, args.coverage_dir,
+                         args.test_paths, replay_dir=args.replay)
+    return asyncio.run(runner.run())
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))